@@ -1,10 +1,12 @@
 import streamlit as st  # Python framework used for creating interactive data apps
 import pandas as pd  # Python library: Makes it easy to work with tabular data
-# plotly: python graphing library    plotly.express: Create common figures more easily
-import plotly.express as px
-import json  # To load mappings from JSON file
+import numpy as np  # Python library: Fast math on whole arrays at once
+import json  # To load mappings from JSON file and turn them into a cache key string
 import os  # To check if files exist
+import io  # To read the uploaded file's bytes like a file
+import hashlib  # To fingerprint the uploaded file
 import datetime  # for working with dates
+import ahocorasick  # Fast search for many keywords at once
 
 # Streamlit page setup
 st.set_page_config(page_title="My Finances", page_icon="💰", layout="wide")
@@ -13,54 +15,329 @@ st.set_page_config(page_title="My Finances", page_icon="💰", layout="wide")
 category_file = "category_mappings_example.json"
 
 
-# Function to assign categories to each transaction
-def categorize_transactions(df, categories):
-    # Initialize all transactions as uncategorized
-    df["Category"] = "Uncategorized"
+# Open the json mappings file and load it into a Python dictionary
+# @st.cache_resource keeps the result in memory; mtime is only used as part of the cache key
+@st.cache_resource(show_spinner=False)
+def load_categories(path, mtime):
+    with open(path, "r") as f:
+        return json.load(f)
+
 
-    # Loop through each category and its keywords. The items() method returns all key-value pairs in a dictionary
-    for category, keywords in categories.items():
+# Function to build a keyword search automaton from the category mappings
+# Aho-Corasick finds every keyword in a description in one pass, no matter how many keywords there are
+# @st.cache_resource keeps one automaton per version of the mappings, so it is only rebuilt when they change
+# categories_key is the mappings as a JSON string (see load_transactions)
+@st.cache_resource(show_spinner=False)
+def get_keyword_automaton(categories_key):
+    categories = json.loads(categories_key)
+    automaton = ahocorasick.Automaton()
+
+    # enumerate() gives each category a priority based on its position in the mappings
+    for priority, (category, keywords) in enumerate(categories.items()):
         # if category is uncategorized or keywords is empty, go to next loop iteration
         if category == "Uncategorized" or not keywords:
             continue
 
-        lowered_keywords = [keyword.lower().strip() for keyword in keywords]
+        for keyword in keywords:
+            keyword = keyword.lower().strip()
+            if keyword:
+                automaton.add_word(keyword, (priority, category))
+
+    automaton.make_automaton()
 
-        # If keyword exists in mapping, assign appropriate category
-        for idx, row in df.iterrows():  # Loop through each row in DataFrame
-            description = row["Description"].lower().strip()
-            for keyword in lowered_keywords:
-                if keyword in description:
-                    df.at[idx, "Category"] = category
-                    break
+    return automaton
+
+
+# Function to assign categories to each transaction
+# Expects a "_desc_lc" column holding the lowercased, stripped descriptions, and the mappings as a JSON string
+def categorize_transactions(df, categories_key):
+    # Initialize all transactions as uncategorized. Categories are collected in a plain NumPy array
+    # and written to the DataFrame once at the end, which is much faster than writing cell by cell
+    cats = np.full(len(df), "Uncategorized", dtype=object)
+
+    automaton = get_keyword_automaton(categories_key)
+
+    # An automaton with no keywords can't be searched, so everything stays uncategorized
+    if len(automaton) > 0:
+        for i, description in enumerate(df["_desc_lc"].to_numpy()):
+            # automaton.iter() yields (end_index, (priority, category)) for each keyword found in the description
+            matches = [match for _, match in automaton.iter(description)]
+
+            # If keywords from several categories match, the category listed last in the mappings wins (same as before)
+            if matches:
+                cats[i] = max(matches)[1]
+
+    df["Category"] = cats
 
     return df
 
 
 # Load transactions from file into pandas dataframe, and call categorize_transactions
-def load_transactions(file, categories):
+# @st.cache_data remembers the result for the same file and mappings, so reruns skip parsing and categorizing
+# categories are passed as a JSON string so the cache key changes whenever the mappings change
+@st.cache_data(show_spinner=False)
+def load_transactions(file_bytes, categories_key):
     try:
-        df = pd.read_csv(file)
+        # engine="pyarrow" - PyArrow's multithreaded CSV reader, faster than the default one
+        df = pd.read_csv(io.BytesIO(file_bytes), engine="pyarrow")
 
         # Clean up data
+        # Strip spaces around the header names first, so headers like "Date, Description, Amount" still work
         df.columns = [col.strip() for col in df.columns]
-        df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
-        df["Date"] = df["Date"].dt.date
+        # Only keep the three columns the dashboard uses
+        df = df[["Date", "Description", "Amount"]]
+
+        # Store descriptions as PyArrow-backed strings: one contiguous buffer instead of one Python object per row,
+        # and .str methods run on Arrow's compiled string functions
+        df = df.astype({"Description": "string[pyarrow]", "Amount": "float64"})
+
+        # Keep Date as a pandas datetime column so comparisons run on fast numeric values instead of Python date objects
+        # cache=True parses each distinct date string only once
+        df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y", cache=True)
 
-        return categorize_transactions(df, categories)
+        # Rows with a blank Amount have nothing to add to any total, so leave them out
+        # (integers have no "missing" value, so they can't be converted below)
+        df = df.dropna(subset=["Amount"])
+
+        # Store amounts as whole cents in 64-bit integers instead of float dollars
+        # Sums are exact (no floating point rounding). Converted back to dollars only for display
+        df["Cents"] = np.rint(df["Amount"] * 100).astype(np.int64)
+        df = df.drop(columns="Amount")
+
+        # Lowercase and strip every description once up front, so matching never has to redo it
+        # fillna("") - treat missing descriptions as empty text so they stay uncategorized
+        df["_desc_lc"] = df["Description"].str.lower().str.strip().fillna("")
+
+        df = categorize_transactions(df, categories_key)
+
+        # The lowercased copy is only needed for matching, so don't show it in the dashboard
+        df = df.drop(columns="_desc_lc")
+
+        # Category and Description repeat the same few strings over and over
+        # category dtype stores each distinct string once and uses small integer codes per row, which is smaller and faster to group by
+        df["Category"] = df["Category"].astype("category")
+        df["Description"] = df["Description"].astype("category")
+
+        return df
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
         return None
 
 
+# Build every table needed by the dashboard for the 12 months ending today
+# Returns a dictionary of DataFrames so main() only has to display them
+def summarize_transactions(df, today):
+    # =================================================
+    # Set up to get only last 12 months of data
+    # =================================================
+    first_day_this_month = today.replace(day=1)
+
+    # Convert date to pandas Timestamp so it can be compared with the Date column
+    first_day_ts = pd.Timestamp(first_day_this_month)
+    # Gives first day 12 months ago
+    start_date = first_day_ts - pd.DateOffset(months=11)
+
+    end_date = pd.Timestamp(today)
+
+    df_last12 = df[(df["Date"] >= start_date)
+                   & (df["Date"] <= end_date)]
+
+    # Label every transaction as a Credit or Debit once, then reuse the label below
+    # np.where() - vectorized if/else: picks "Credit" where the condition is True, otherwise "Debit"
+    df_last12 = df_last12.assign(
+        Side=np.where(df_last12["Cents"] >= 0, "Credit", "Debit"))
+
+    # =================================================
+    # Graph 1: Cumulative Net Change
+    # =================================================
+    # Bank exports are usually already in date order, so only sort when they aren't
+    # mergesort is stable (keeps same-day transactions in file order) and fast on nearly sorted data
+    if df_last12["Date"].is_monotonic_increasing:
+        df_sorted = df_last12
+    else:
+        df_sorted = df_last12.sort_values("Date", kind="mergesort")
+    # pandas method - creates cumulative sum column (in dollars)
+    df_sorted = df_sorted.assign(
+        **{"Net Balance": df_sorted["Cents"].cumsum() / 100})
+
+    # =================================================
+    # Table 1: Monthly Summary
+    # =================================================
+    # Month each transaction falls in, as a Period (e.g. 2025-05). Date is already a datetime column, so no re-parsing needed
+    month_period = df_last12["Date"].dt.to_period("M")
+
+    # Split every amount into a credit part and a debit part. clip(lower=0) replaces negative values with 0,
+    # so a -2000 cent debit becomes Credits=0, Debits=2000
+    amount = df_last12["Cents"]
+
+    # Build the whole table in one chain:
+    # sum credits and debits for each month in a single groupby (index=month Period, columns=Credits/Debits),
+    # calculate Net Change, convert cents to dollars, and sort with most recent month at top
+    monthly_sum = (df_last12
+                   .assign(Credits=amount.clip(lower=0),
+                           Debits=(-amount).clip(lower=0))
+                   .groupby(month_period)[["Credits", "Debits"]].sum()
+                   .assign(**{"Net Change": lambda x: x["Credits"] - x["Debits"]})
+                   .div(100)
+                   .sort_index(ascending=False))
+
+    # Add Month column for display at the front (only one strftime per month), then reset index to get rid of the Period
+    monthly_sum.insert(0, "Month", monthly_sum.index.strftime("%b %Y"))
+    monthly_sum = monthly_sum.reset_index(drop=True)
+
+    # =================================================
+    # Chart 1: Spending by Category
+    # =================================================
+    # group dataframe by category
+    pie_df = df_last12[df_last12["Cents"] < 0]
+    # observed=True - only include categories that actually appear in the data
+    pie_df = pie_df.groupby("Category", observed=True)[
+        "Cents"].sum().abs().div(100).rename("Amount").reset_index()
+
+    # =================================================
+    # Table 2: Top Vendors
+    # =================================================
+    vendor_df = df_last12.copy()
+
+    vendor_df = vendor_df[vendor_df["Cents"] < 0]
+
+    # Group by vendor and sum total spending in dollars - returns a pandas series
+    vendor_sum = vendor_df.groupby("Description", observed=True)[
+        "Cents"].sum().abs() / 100
+
+    # Convert series to DataFrame
+    vendor_df = pd.DataFrame({
+        "Amount": vendor_sum
+    })
+
+    vendor_df = vendor_df.sort_values(
+        by='Amount', ascending=False).reset_index()
+
+    # =================================================
+    # Table 3: Credits and Debits tabs
+    # =================================================
+    # Convert cents back to a dollar Amount column for display, keeping the original column order
+    transactions_df = df_last12.assign(Amount=df_last12["Cents"] / 100)[
+        ["Date", "Description", "Amount", "Category", "Side"]]
+
+    # query() filters rows using the Side label. Side is dropped since each tab only shows one side
+    debits_df = transactions_df.query(
+        "Side == 'Debit'").drop(columns="Side")
+    credits_df = transactions_df.query(
+        "Side == 'Credit'").drop(columns="Side")
+
+    return {
+        "df_sorted": df_sorted,
+        "monthly_sum": monthly_sum,
+        "pie_df": pie_df,
+        "vendor_df": vendor_df,
+        "credits_df": credits_df,
+        "debits_df": debits_df,
+    }
+
+
+# Draw the charts and tables from the tables built by summarize_transactions
+# @st.fragment would let widgets inside this function rerun only this part of the script
+# There are no such widgets yet (switching st.tabs happens in the browser and doesn't rerun anything), so today this has no effect
+@st.fragment
+def render_dashboard(summary):
+    # plotly: python graphing library    plotly.express: Create common figures more easily
+    # Imported here rather than at the top so the page loads faster before a file is uploaded
+    # (Python keeps imported modules in memory, so later reruns don't import it again)
+    import plotly.express as px
+
+    # =================================================
+    # Graph 1: Cumulative Net Change
+    # =================================================
+    # Create line chart using plotly express
+    # render_mode="webgl" - draw the line with the GPU, which stays fast with many points
+    cnb_fig = px.line(summary["df_sorted"],
+                      x="Date",
+                      y="Net Balance",
+                      title="Cumulative Net Change",
+                      render_mode="webgl")
+
+    # Format x axis
+    cnb_fig.update_xaxes(
+        dtick="M1",  # Tick at every month
+        tickformat="%b %Y",
+        ticklabelmode="period"  # Center labels in middle of month
+    )
+
+    # Add horizontal line at x-axis
+    cnb_fig.add_hline(y=0, line_dash="solid", line_color="black")
+
+    # Update y axis label
+    # uirevision - keep the chart's zoom/pan state across reruns instead of redrawing from scratch
+    cnb_fig.update_layout(yaxis_title="Balance ($)", uirevision="fixed")
+
+    # write to streamlit
+    # displayModeBar=False - hide the plotly toolbar, which isn't used
+    st.plotly_chart(cnb_fig, use_container_width=True,
+                    config={"displayModeBar": False})
+
+    # =================================================
+    # Table 1: Monthly Summary
+    # =================================================
+    # function to color net change red=negative green=positive
+    # Receives the whole column at once and returns one inline css string per value
+    def color_net_change(column):
+        return np.where(column > 0, "color: green;", "color: red;")
+
+    # Display table in streamlit
+    st.subheader("Monthly Summary")
+    # Write table to streamlit
+    # apply() - apply a function to each column of a DataFrame (or subset of DataFrame)
+    # format() - Change all values in the given columns to have 2 decimal places
+    st.write(summary["monthly_sum"].style
+             .apply(color_net_change, subset=["Net Change"])
+             .format({"Credits": "{:.2f}", "Debits": "{:.2f}", "Net Change": "{:.2f}"})
+             )
+
+    # =================================================
+    # Chart 1: Spending by Category
+    # =================================================
+    pie_fig = px.pie(
+        summary["pie_df"],
+        values="Amount",
+        names="Category",
+        title="Spending by Category"
+    )
+    st.plotly_chart(pie_fig, use_container_width=True,
+                    config={"displayModeBar": False})
+
+    # =================================================
+    # Table 2: Top Vendors
+    # =================================================
+    st.subheader("Top Vendors")
+    st.write(summary["vendor_df"].style
+             .format("{:.2f}", subset=["Amount"]))
+
+    # =================================================
+    # Table 3: Credits and Debits tabs
+    # =================================================
+    st.subheader("All Transactions")
+
+    tab1, tab2 = st.tabs(["Credits", "Debits"])
+    with tab1:
+        st.write(summary["credits_df"].style
+                 .format("{:.2f}", subset=["Amount"])
+                 .format("{:%Y-%m-%d}", subset=["Date"]))
+    with tab2:
+        st.write(summary["debits_df"].style
+                 .format("{:.2f}", subset=["Amount"])
+                 .format("{:%Y-%m-%d}", subset=["Date"]))
+
+
 def main():
     st.title("My Finance Dashboard")
     st.markdown("**Past 12 Months**")
 
-    # Check if json file exists. If it does, open it and load into Python dictionary called 'categories'
+    # Check if json file exists. If it does, load it into Python dictionary called 'categories'
+    # Passing the file's last-modified time means the file is only read again after it changes
     if os.path.exists(category_file):
-        with open(category_file, "r") as f:
-            categories = json.load(f)
+        categories = load_categories(
+            category_file, os.path.getmtime(category_file))
     else:
         categories = {"Uncategorized": []}
 
@@ -69,167 +346,27 @@ def main():
         "Upload your transaction CSV file in the format: [Date],[Description],[Amount]", type=["csv"])
 
     if uploaded_file is not None:
+        file_bytes = uploaded_file.getvalue()
+        categories_key = json.dumps(categories)
+
         # df stands for DataFrame. Primary data structure in pandas that you can filter, group, sort, summarize, etc. Like an Excel table
-        df = load_transactions(uploaded_file, categories)
+        df = load_transactions(file_bytes, categories_key)
 
         if df is not None:
-            # =================================================
-            # Set up to get only last 12 months of data
-            # =================================================
             today = datetime.date.today()
-            first_day_this_month = today.replace(day=1)
-
-            # Convert date to pandas Timestamp
-            first_day_ts = pd.Timestamp(first_day_this_month)
-            # Gives first day 12 months ago
-            start_date_ts = first_day_ts - pd.DateOffset(months=11)
-            start_date = start_date_ts.date()  # convert back to date
-
-            end_date = today
-
-            df_last12 = df[(df["Date"] >= start_date)
-                           & (df["Date"] <= end_date)]
-
-            # =================================================
-            # Graph 1: Cumulative Net Change
-            # =================================================
-            df_sorted = df_last12.sort_values("Date")
-            # pandas method - creates cumulative sum column
-            df_sorted["Net Balance"] = df_sorted["Amount"].cumsum()
-
-            # Create line chart using plotly express
-            cnb_fig = px.line(df_sorted,
-                              x="Date",
-                              y="Net Balance",
-                              title="Cumulative Net Change")
-
-            # Format x axis
-            cnb_fig.update_xaxes(
-                dtick="M1",  # Tick at every month
-                tickformat="%b %Y",
-                ticklabelmode="period"  # Center labels in middle of month
-            )
-
-            # Add horizontal line at x-axis
-            cnb_fig.add_hline(y=0, line_dash="solid", line_color="black")
-
-            # Update y axis label
-            cnb_fig.update_layout(yaxis_title="Balance ($)")
-
-            # write to streamlit
-            st.write(cnb_fig)
-
-            # =================================================
-            # Table 1: Monthly Summary
-            # =================================================
-            summary_df = df_last12.copy()
-
-            # Create column with month/year objects for sorting
-            summary_df["MonthPeriod"] = pd.to_datetime(
-                summary_df["Date"]).dt.to_period("M")
-
-            # Create month column for display
-            summary_df["Month"] = summary_df["MonthPeriod"].dt.strftime(
-                "%b %Y")
-
-            # Calculate credits and debits values for each month (will be stored as a pandas series where index=MonthPeriod, value=sum of amounts)
-            credits = summary_df[summary_df["Amount"] > 0].groupby("MonthPeriod")[
-                "Amount"].sum()
-            debits = summary_df[summary_df["Amount"] < 0].groupby("MonthPeriod")[
-                "Amount"].sum().abs()
-
-            # Combine credits and debits into a dataframe, index is MonthPeriod
-            monthly_sum = pd.DataFrame({
-                "Credits": credits,
-                "Debits": debits
-            })
-
-            # Sort with most recent month at top
-            monthly_sum = monthly_sum.sort_values(
-                "MonthPeriod", ascending=False)
-
-            # Calculate Net Change
-            monthly_sum["Net Change"] = monthly_sum["Credits"] - \
-                monthly_sum["Debits"]
-
-            # Add Month column for display
-            monthly_sum["Month"] = monthly_sum.index.strftime("%b %Y")
-
-            # Move month to front
-            monthly_sum = monthly_sum[["Month",
-                                      "Credits", "Debits", "Net Change"]]
-
-            # Reset index to get rid of MonthPeriod
-            monthly_sum = monthly_sum.reset_index(drop=True)
-
-            # function to color net change red=negative green=positive
-            def color_net_change(value):
-                # Return string will become inline css for coloring
-                return f"color: {'green' if value > 0 else 'red'};"
-
-            # Display table in streamlit
-            st.subheader("Monthly Summary")
-            # Write table to streamlit
-            # applymap() - apply a function element-wise to a DataFrame (or subset of DataFrame)
-            # format() - Change all values in subset to have 2 decimal places
-            st.write(monthly_sum.style
-                     .applymap(color_net_change, subset=["Net Change"])
-                     .format("{:.2f}", subset=["Credits", "Debits", "Net Change"])
-                     )
-
-            # =================================================
-            # Chart 1: Spending by Category
-            # =================================================
-            # group dataframe by category
-            pie_df = df_last12[df_last12["Amount"] < 0]
-            pie_df = pie_df.groupby("Category")[
-                "Amount"].sum().abs().reset_index()
-
-            pie_fig = px.pie(
-                pie_df,
-                values="Amount",
-                names="Category",
-                title="Spending by Category"
-            )
-            st.write(pie_fig)
-
-            # =================================================
-            # Table 2: Top Vendors
-            # =================================================
-            vendor_df = df_last12.copy()
-
-            vendor_df = vendor_df[vendor_df["Amount"] < 0]
-
-            # Group by vendor and sum total spending - returns a pandas series
-            vendor_sum = vendor_df.groupby("Description")["Amount"].sum().abs()
-
-            # Convert series to DataFrame
-            vendor_df = pd.DataFrame({
-                "Amount": vendor_sum
-            })
-
-            vendor_df = vendor_df.sort_values(
-                by='Amount', ascending=False).reset_index()
-
-            st.subheader("Top Vendors")
-            st.write(vendor_df.style
-                     .format("{:.2f}", subset=["Amount"]))
-
-            # =================================================
-            # Table 3: Credits and Debits tabs
-            # =================================================
-            debits_df = df_last12[df_last12["Amount"] < 0]
-            credits_df = df_last12[df_last12["Amount"] >= 0]
-
-            st.subheader("All Transactions")
-
-            tab1, tab2 = st.tabs(["Credits", "Debits"])
-            with tab1:
-                st.write(credits_df.style
-                         .format("{:.2f}", subset=["Amount"]))
-            with tab2:
-                st.write(debits_df.style
-                         .format("{:.2f}", subset=["Amount"]))
+
+            # The tables only change when the file, the mappings, or the date change
+            # Keep them in st.session_state so reruns (e.g. clicking a tab) don't recompute them
+            summary_key = (hashlib.md5(file_bytes).hexdigest(),
+                           categories_key, str(today))
+            if st.session_state.get("summary_key") != summary_key:
+                st.session_state["summary"] = summarize_transactions(
+                    df, today)
+                st.session_state["summary_key"] = summary_key
+
+            summary = st.session_state["summary"]
+
+            render_dashboard(summary)
 
 
 main()